@@ -22,6 +22,28 @@ Environment variables:
     OPENAI_CHAT_PATH     Chat completions endpoint path (default: /v1/chat/completions).
     OPENAI_API_KEY       API key for the configured OpenAI-compatible service.
     OPENAI_MODEL         Model name to use (default: gpt-4o-mini).
+    OPENAI_CONCURRENCY   Number of batches tagged concurrently (default: 8).
+    OPENAI_BATCH_SIZE    Maximum number of links tagged per request (default: 10).
+    OPENAI_BATCH_TOKENS  Token budget for the link texts of one request (default: 6000).
+    OPENAI_RPM           Maximum chat completion requests per minute (default: 500).
+    LINKWARDEN_CONCURRENCY  Number of link updates sent concurrently (default: 8).
+    LINKWARDEN_BATCH_SIZE   Maximum number of links per bulk update request; 1 updates
+                         every link on its own (default: 20).
+    WORKER_PROCESSES     Number of processes the links are tagged in (default:
+                         min(8, CPU count) for a localhost OPENAI_BASE_URL, else 1).
+    CACHE_DIR            Directory for the tag cache (default: ~/.cache/linkwarden_ai_tags).
+    CACHE_TTL            Seconds a cached tag list stays valid; 0 disables the cache
+                         (default: 2592000, i.e. 30 days).
+    CHECKPOINT_PATH      SQLite file recording updated link ids, which are skipped on
+                         later runs; empty disables it. Ids are only valid for one
+                         instance (default: $CACHE_DIR/processed-<hash>.sqlite, with
+                         a hash of LINKWARDEN_BASE_URL).
+    SEMANTIC_CACHE       Set to 1 to also reuse tags of near-duplicate texts; requires
+                         sentence-transformers and faiss-cpu (default: 0).
+    SEMANTIC_CACHE_THRESHOLD  Minimum cosine similarity for a semantic cache hit
+                         (default: 0.92).
+    SEMANTIC_CACHE_MODEL  Sentence-transformers model used for embeddings
+                         (default: all-MiniLM-L6-v2).
 
 The script fetches links from the search endpoint, skips items that already have
 tags or are marked as aiTagged, generates up to five concise tags with an LLM, and
@@ -29,12 +51,33 @@ updates each link via the public API.
 """
 
 import ast
-import json
+import asyncio
+import functools
+import hashlib
+import multiprocessing
 import os
+import re
+import sqlite3
 import sys
-from typing import Iterable, List, Optional
+import time
+from queue import Empty, Full
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 
-import requests
+import aiohttp
+import httpx
+import ijson
+import orjson
+import tiktoken
+from aiolimiter import AsyncLimiter
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from tenacity.wait import wait_base
 
 RAW_BASE_URL = os.getenv("LINKWARDEN_BASE_URL", "http://localhost:3000")
 LINKWARDEN_SEARCH_PATH = os.getenv("LINKWARDEN_SEARCH_PATH", "/api/v1/search")
@@ -44,6 +87,17 @@ RAW_OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
 OPENAI_CHAT_PATH = os.getenv("OPENAI_CHAT_PATH", "/v1/chat/completions")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+OPENAI_BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", "10"))
+OPENAI_BATCH_TOKENS = int(os.getenv("OPENAI_BATCH_TOKENS", "6000"))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+LINKWARDEN_CONCURRENCY = int(os.getenv("LINKWARDEN_CONCURRENCY", "8"))
+LINKWARDEN_BATCH_SIZE = int(os.getenv("LINKWARDEN_BATCH_SIZE", "20"))
+CACHE_DIR = os.path.expanduser(os.getenv("CACHE_DIR", "~/.cache/linkwarden_ai_tags"))
+CACHE_TTL = int(os.getenv("CACHE_TTL", str(30 * 86400)))
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
 
 
 def require(value: Optional[str], name: str) -> str:
@@ -52,6 +106,7 @@ def require(value: Optional[str], name: str) -> str:
     return value
 
 
+@functools.lru_cache(maxsize=8)
 def normalize_base_url(raw: str, name: str = "BASE_URL") -> str:
     """Return a sanitized base URL string.
 
@@ -82,7 +137,28 @@ def normalize_base_url(raw: str, name: str = "BASE_URL") -> str:
 BASE_URL = normalize_base_url(RAW_BASE_URL, "LINKWARDEN_BASE_URL")
 OPENAI_BASE_URL = normalize_base_url(RAW_OPENAI_BASE_URL, "OPENAI_BASE_URL")
 
+# Link ids are only unique within one Linkwarden instance, so the default
+# checkpoint file is kept per instance.
+BASE_URL_DIGEST = hashlib.sha256(BASE_URL.encode()).hexdigest()[:12]
+CHECKPOINT_PATH = os.path.expanduser(
+    os.getenv(
+        "CHECKPOINT_PATH",
+        os.path.join(CACHE_DIR, f"processed-{BASE_URL_DIGEST}.sqlite"),
+    )
+)
+
+# A model server on the same machine (e.g. vLLM or Ollama) is limited by how
+# fast a single event loop can feed it rather than by provider rate limits,
+# so the links are then tagged in several processes.
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+PROCESSES = int(os.getenv("WORKER_PROCESSES", "0")) or (
+    min(8, os.cpu_count() or 1)
+    if urlparse(OPENAI_BASE_URL).hostname in LOCAL_HOSTS
+    else 1
+)
+
 
+@functools.lru_cache(maxsize=64)
 def join_url(base: str, path: str) -> str:
     path = path or ""
     if not path.startswith("/"):
@@ -90,83 +166,798 @@ def join_url(base: str, path: str) -> str:
     return base.rstrip("/") + path
 
 
-def fetch_links(session: requests.Session) -> Iterable[dict]:
-    """Yield all links from the search API."""
-    cursor = 0
-    while True:
-        resp = session.get(
-            join_url(BASE_URL, LINKWARDEN_SEARCH_PATH), params={"cursor": cursor}
-        )
+OPENAI_URL = join_url(OPENAI_BASE_URL, OPENAI_CHAT_PATH)
+SEARCH_URL = join_url(BASE_URL, LINKWARDEN_SEARCH_PATH)
+LINKS_URL = join_url(BASE_URL, LINKWARDEN_LINK_PATH or "/api/v1/links").rstrip("/")
+LINK_UPDATE_URL_TEMPLATE = LINKS_URL + "/{}"
+OPENAI_HEADERS = {
+    "Authorization": f"Bearer {OPENAI_API_KEY}",
+    "Content-Type": "application/json",
+}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return whether ``exc`` is a rate limit, server or transport error."""
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status == 429 or exc.status >= 500
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(
+        exc, (aiohttp.ClientConnectionError, httpx.TransportError, asyncio.TimeoutError)
+    )
+
+
+def retry_after(exc: Optional[BaseException]) -> Optional[float]:
+    if isinstance(exc, aiohttp.ClientResponseError):
+        headers = exc.headers
+    elif isinstance(exc, httpx.HTTPStatusError):
+        headers = exc.response.headers
+    else:
+        return None
+    try:
+        return float(headers.get("Retry-After")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class wait_retry_after(wait_base):
+    """Wait as long as the server asks via ``Retry-After``, else use ``fallback``."""
+
+    def __init__(self, fallback: wait_base, limit: float = 60) -> None:
+        self.fallback = fallback
+        self.limit = limit
+
+    def __call__(self, retry_state: RetryCallState) -> float:
+        delay = retry_after(retry_state.outcome.exception())
+        if delay is None:
+            return self.fallback(retry_state)
+        return min(delay, self.limit)
+
+
+def log_retry(retry_state: RetryCallState) -> None:
+    print(
+        f"Retrying {retry_state.fn.__name__} in "
+        f"{retry_state.next_action.sleep:.1f}s after: "
+        f"{retry_state.outcome.exception()}",
+        file=sys.stderr,
+    )
+
+
+retry_transient = retry(
+    retry=retry_if_exception(is_retryable),
+    wait=wait_retry_after(wait_exponential_jitter(initial=1, max=30)),
+    stop=stop_after_attempt(6),
+    before_sleep=log_retry,
+    reraise=True,
+)
+# Each process gets its share of the overall request rate.
+openai_limiter = AsyncLimiter(OPENAI_RPM / PROCESSES, 60)
+
+
+SENTINEL = object()
+
+
+class Checkpoint:
+    """Ids of links updated by earlier runs, persisted in SQLite.
+
+    Lets an interrupted bulk run resume without tagging the already
+    updated links again. Inserts are committed in groups of
+    ``commit_every`` and on ``close``. Only one process writes the file;
+    worker processes forward their ids to it (see ``forward_to``).
+    """
+
+    def __init__(self, path: str, commit_every: int = 50) -> None:
+        self.path = path
+        self.commit_every = commit_every
+        self.done: set = set()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pending = 0
+        self._forward: Any = None
+
+    def forward_to(self, queue: Any) -> None:
+        """Put added ids on a multiprocessing ``queue`` instead of storing them."""
+        self.path = ""
+        self._forward = queue
+
+    def open(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS done (id INTEGER PRIMARY KEY)")
+        self.done = {row[0] for row in self._db.execute("SELECT id FROM done")}
+
+    def __contains__(self, link_id: object) -> bool:
+        return link_id in self.done
+
+    def add(self, link_id: int) -> None:
+        if self._forward is not None:
+            self._forward.put(link_id)
+            return
+        self.done.add(link_id)
+        if self._db is None:
+            return
+        self._db.execute("INSERT OR IGNORE INTO done VALUES (?)", (link_id,))
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+            self._pending = 0
+
+
+checkpoint = Checkpoint(CHECKPOINT_PATH)
+
+
+class ResponseReader:
+    """Expose a streamed httpx response as the async file object ijson reads."""
+
+    def __init__(self, resp: httpx.Response) -> None:
+        self._chunks = resp.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes the stream type with read(0).
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+@retry_transient
+async def stream_page(
+    session: httpx.AsyncClient, cursor: int
+) -> Tuple[List[dict], Optional[int]]:
+    """Return the links of one search page that still need tags.
+
+    The page is decoded incrementally. The search API cannot filter out
+    tagged links, so links are dropped as soon as an ``aiTagged`` flag, a
+    first tag or an id from the ``checkpoint`` is parsed, without building
+    the rest of them. The remaining links are only queued after the
+    response has been read, so a stalled tag stage cannot hold the
+    connection open until a proxy drops it, and a failed page can be
+    retried from the same cursor. Returns the links and the cursor of the
+    next page, or ``None`` after the last page.
+    """
+    links: List[dict] = []
+    next_cursor = None
+    builder = None
+    async with session.stream("GET", SEARCH_URL, params={"cursor": cursor}) as resp:
         resp.raise_for_status()
-        payload = resp.json().get("data", {})
-        links = payload.get("links", [])
+        async for prefix, event, value in ijson.parse_async(
+            ResponseReader(resp), use_float=True
+        ):
+            if prefix == "data.links.item" and event == "end_map":
+                if builder is not None:
+                    links.append(builder.value)
+                    builder = None
+            elif builder is not None:
+                if (
+                    (prefix == "data.links.item.id" and value in checkpoint)
+                    or (prefix == "data.links.item.aiTagged" and value is True)
+                    or (prefix == "data.links.item.tags.item" and event == "start_map")
+                ):
+                    builder = None
+                else:
+                    builder.event(event, value)
+            elif prefix == "data.links.item" and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == "data.nextCursor":
+                next_cursor = value
+    return links, next_cursor
+
+
+async def fetch_links(session: httpx.AsyncClient, queue: Any) -> None:
+    """Put all links that still need tags onto ``queue``, followed by ``SENTINEL``.
+
+    Runs as its own task so that links of the first page are already being
+    tagged while the following pages are fetched; the bounded queue keeps
+    enough links buffered to hide the search latency behind the tagging.
+    """
+    cursor: Optional[int] = 0
+    while cursor is not None:
+        links, cursor = await stream_page(session, cursor)
         for link in links:
-            yield link
-        cursor = payload.get("nextCursor")
-        if cursor is None:
+            await queue.put(link)
+    # Not sent on errors: the failed run is cancelled anyway, and waiting for
+    # room in a full queue would block that cancellation.
+    await queue.put(SENTINEL)
+
+
+class ShardQueues:
+    """Hand links to worker processes through multiprocessing queues.
+
+    Offers the ``put`` of an ``asyncio.Queue`` to ``fetch_links``: each
+    link goes to the queue of worker ``id % len(queues)``, and ``SENTINEL``
+    becomes ``None`` on every queue. A full queue is waited on in a thread,
+    so the event loop is never blocked, and a worker that has died raises
+    instead of stalling the producer.
+    """
+
+    def __init__(self, queues: List[Any], workers: List[Any]) -> None:
+        self.queues = queues
+        self.workers = workers
+
+    async def put(self, link: Any) -> None:
+        if link is not SENTINEL:
+            await self._hand_over(link["id"] % len(self.queues), link)
+            return
+        for shard in range(len(self.queues)):
+            await self._hand_over(shard, None)
+
+    async def _hand_over(self, shard: int, item: Optional[dict]) -> None:
+        target = self.queues[shard]
+        try:
+            target.put_nowait(item)
+            return
+        except Full:
+            pass
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, target.put, item, True, 1)
+                return
+            except Full:
+                if not self.workers[shard].is_alive():
+                    if item is None:
+                        return
+                    raise RuntimeError(f"Worker process {shard} exited early")
+
+
+async def receive_links(source: Any, queue: asyncio.Queue) -> None:
+    """Move links handed over by the parent process from ``source`` to ``queue``.
+
+    Puts ``SENTINEL`` on ``queue`` once the parent sends ``None``.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # Waits in a thread; the timeout lets a cancelled run shut down
+            # its executor instead of waiting for the next link.
+            link = await loop.run_in_executor(None, source.get, True, 1)
+        except Empty:
+            continue
+        if link is None:
             break
+        await queue.put(link)
+    await queue.put(SENTINEL)
+
 
+async def collect_done(done: Any, workers: List[Any]) -> None:
+    """Record the ids that worker processes put on ``done`` in ``checkpoint``.
 
+    Returns once all ``workers`` have exited and ``done`` is drained.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        alive = any(worker.is_alive() for worker in workers)
+        try:
+            link_id = await loop.run_in_executor(None, done.get, True, 0.5)
+        except Empty:
+            if not alive:
+                return
+            continue
+        checkpoint.add(link_id)
+
+
+# The system prompt is sent verbatim with every request and is deliberately
+# longer than 1024 tokens: OpenAI caches identical prompt prefixes of that
+# size, which makes the input tokens of every following request cheaper and
+# faster. Keep it free of per-run values and put all variable content into
+# the user message.
 PROMPT_SYSTEM = (
-    "Return only a JSON array of up to 5 short tags (1-2 words) that summarize "
-    "the provided text. Use the text language. If no tags apply, return []."
+    "You are a tagging service for a bookmark manager. You receive numbered "
+    "texts, each starting with its index in brackets like [1]. Every text "
+    "describes one saved web page: its description, its extracted content or "
+    "its title. Return a JSON object whose results array contains one entry "
+    "per input text with its index and an array of up to 5 short tags (1-2 "
+    'words) that summarize that text, e.g. {"results": [{"index": 1, "tags": '
+    '["tag", "tag"]}, {"index": 2, "tags": []}]}. If no tags apply to a text, '
+    "return an empty tags array for its index."
+    "\n\n"
+    "Tagging rules:\n"
+    "1. Describe the topic of the page, not its form. Never use generic tags "
+    "such as article, blog, website, page, link, news, post, video, guide or "
+    "tutorial unless the form itself is the subject.\n"
+    "2. Each tag has one or two words. Use lowercase, except for proper nouns "
+    "and established acronyms such as Python, PostgreSQL, NASA or EU.\n"
+    "3. Prefer singular nouns (database, not databases) and the most common "
+    "name of a concept (machine learning, not ML techniques).\n"
+    "4. Order tags from most to least relevant. Return fewer than five tags "
+    "when the text does not support five distinct ones.\n"
+    "5. Do not repeat a tag and avoid near-duplicates such as python and "
+    "python programming; keep the more specific one only if both add value.\n"
+    "6. Name central products, programming languages, organizations, places "
+    "and people when the text is about them.\n"
+    "7. Use the language of each text. For mixed-language texts use the "
+    "dominant language. Keep established English technical terms such as "
+    "open source or machine learning when the text uses them.\n"
+    "8. Do not invent facts that are not in the text. If the text is empty, "
+    "too short to understand, a cookie banner, a login or error page, or a "
+    "paywall notice, return an empty tags array for its index.\n"
+    "9. Do not use hashtags, emojis, quotes or punctuation inside tags; "
+    "hyphens are allowed when they are part of a term.\n"
+    "10. Every input index must appear exactly once in the results, in input "
+    "order.\n"
+    "\n"
+    "Example input:\n"
+    "[1] A step-by-step introduction to asyncio in Python, covering event "
+    "loops, tasks, semaphores and how to run many HTTP requests concurrently "
+    "with aiohttp.\n\n"
+    "[2] Rezept für klassischen Apfelstrudel mit selbstgemachtem Strudelteig, "
+    "Rosinen, Zimt und Vanillesauce. Zubereitungszeit etwa 90 Minuten.\n\n"
+    "[3] We use cookies to improve your experience. Accept all cookies or "
+    "manage your preferences.\n\n"
+    "[4] NASA's James Webb Space Telescope captured new infrared images of "
+    "the Pillars of Creation, revealing newly forming stars inside the dust "
+    "clouds.\n\n"
+    "[5] Comparison of PostgreSQL and MySQL for write-heavy workloads, with "
+    "benchmarks for indexing, replication and connection pooling.\n"
+    "Example output:\n"
+    '{"results": [{"index": 1, "tags": ["Python", "asyncio", "concurrency", '
+    '"aiohttp"]}, {"index": 2, "tags": ["Apfelstrudel", "Rezept", "Backen", '
+    '"Dessert"]}, {"index": 3, "tags": []}, {"index": 4, "tags": ["James Webb", '
+    '"NASA", "astronomy", "star formation"]}, {"index": 5, "tags": ["PostgreSQL", '
+    '"MySQL", "database", "benchmark", "replication"]}]}\n'
+    "\n"
+    "Example input:\n"
+    "[1] Die Bundesregierung beschließt ein Förderprogramm für Wärmepumpen "
+    "in Bestandsgebäuden; Eigentümer können bis zu 70 Prozent Zuschuss "
+    "erhalten.\n\n"
+    "[2] How to train for your first marathon: a 16-week plan with long runs, "
+    "interval training, tapering and nutrition tips.\n\n"
+    "[3] 404 - Page not found.\n\n"
+    "[4] Kubernetes operators explained: extending the Kubernetes API with "
+    "custom resources and controllers to automate stateful applications.\n\n"
+    "[5] Guía para viajar por Japón en tren con el Japan Rail Pass: rutas, "
+    "precios y consejos para Tokio, Kioto y Osaka.\n"
+    "Example output:\n"
+    '{"results": [{"index": 1, "tags": ["Wärmepumpe", "Förderung", '
+    '"Energiewende", "Gebäudesanierung"]}, {"index": 2, "tags": ["marathon", '
+    '"running", "training plan", "nutrition"]}, {"index": 3, "tags": []}, '
+    '{"index": 4, "tags": ["Kubernetes", "operator", "custom resources", '
+    '"automation"]}, {"index": 5, "tags": ["Japón", "viajes", "tren", '
+    '"Japan Rail Pass"]}]}\n'
+    "\n"
+    "Example input:\n"
+    "[1] Rust ownership and borrowing made simple: why the borrow checker "
+    "rejects your code and how lifetimes prevent dangling references.\n\n"
+    "[2] Subscribe to continue reading. Already a subscriber? Log in.\n\n"
+    "[3] Les meilleures randonnées dans les Alpes françaises, du lac "
+    "d'Annecy au massif du Mont-Blanc, avec cartes et niveaux de "
+    "difficulté.\n\n"
+    "[4] The European Central Bank raised interest rates again to fight "
+    "inflation, citing rising energy prices across the euro area.\n\n"
+    "[5] Open-source home automation with Home Assistant: integrating Zigbee "
+    "sensors, dashboards and automations on a Raspberry Pi.\n"
+    "Example output:\n"
+    '{"results": [{"index": 1, "tags": ["Rust", "ownership", "borrow checker", '
+    '"lifetimes"]}, {"index": 2, "tags": []}, {"index": 3, "tags": ["randonnée", '
+    '"Alpes", "Mont-Blanc", "montagne"]}, {"index": 4, "tags": ["ECB", '
+    '"interest rates", "inflation", "monetary policy", "eurozone"]}, {"index": '
+    '5, "tags": ["Home Assistant", "home automation", "Zigbee", "Raspberry Pi", '
+    '"open source"]}]}\n'
+    "\n"
+    "Example input:\n"
+    "[1] Figma tips for designers: auto layout, components, variants and "
+    "design systems that scale across teams.\n\n"
+    "[2] Sourdough bread for beginners: feeding a starter, hydration, "
+    "stretch and fold, and baking in a Dutch oven.\n\n"
+    "[3] Wie man mit Git Rebase eine saubere Commit-Historie erhält und "
+    "Merge-Konflikte beim interaktiven Rebase löst.\n\n"
+    "[4] Climate report: global average temperatures in 2023 were the highest "
+    "on record, driven by greenhouse gas emissions and El Niño.\n\n"
+    "[5] ok\n"
+    "Example output:\n"
+    '{"results": [{"index": 1, "tags": ["Figma", "UI design", "design system", '
+    '"components"]}, {"index": 2, "tags": ["sourdough", "bread", "baking", '
+    '"fermentation"]}, {"index": 3, "tags": ["Git", "Rebase", '
+    '"Versionskontrolle", "Merge-Konflikt"]}, {"index": 4, "tags": ["climate '
+    'change", "global warming", "El Niño", "emissions"]}, {"index": 5, "tags": '
+    "[]}]}"
 )
+# Structured output guarantees a reply of this shape, so it can be decoded
+# directly. The schema does not depend on the batch size, which keeps it part
+# of the cacheable prefix.
+TAGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "tags": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": 5,
+                    },
+                },
+                "required": ["index", "tags"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+OPENAI_REQUEST_TEMPLATE = {
+    "model": OPENAI_MODEL,
+    "temperature": 0.1,
+    "response_format": {
+        "type": "json_schema",
+        "json_schema": {"name": "tags", "schema": TAGS_SCHEMA, "strict": True},
+    },
+}
+SYSTEM_MESSAGE = {"role": "system", "content": PROMPT_SYSTEM}
 
 
-def trim_text(text: str, limit: int = 1000) -> str:
-    compact = " ".join((text or "").split())
-    return compact[:limit]
+@functools.lru_cache(maxsize=1)
+def load_encoding() -> Optional[tiktoken.Encoding]:
+    """Tokenizer of ``OPENAI_MODEL``, loaded on first use.
 
+    Models unknown to tiktoken (e.g. self-hosted ones) use ``o200k_base``.
+    tiktoken downloads its data on first use; if that fails (e.g. offline
+    without a populated ``TIKTOKEN_CACHE_DIR``), ``None`` is returned and
+    texts are cut by characters instead.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(OPENAI_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as exc:  # download failures surface as various types
+        print(
+            f"Could not load a tiktoken encoding, cutting texts by length: {exc}",
+            file=sys.stderr,
+        )
+        return None
 
-def request_tags(text: str) -> List[str]:
-    if not text:
-        return []
 
-    content = trim_text(text)
-    resp = requests.post(
-        join_url(OPENAI_BASE_URL, OPENAI_CHAT_PATH),
-        headers={
-            "Authorization": f"Bearer {require(OPENAI_API_KEY, 'OPENAI_API_KEY')}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "model": OPENAI_MODEL,
-            "messages": [
-                {"role": "system", "content": PROMPT_SYSTEM},
-                {"role": "user", "content": content},
-            ],
-            "temperature": 0.1,
-            "max_tokens": 80,
-        },
-        timeout=60,
-    )
-    resp.raise_for_status()
-    message = resp.json()["choices"][0]["message"]["content"].strip()
+def trim_text(text: str, budget: int = 400) -> Tuple[str, int]:
+    """Collapse whitespace and cut ``text`` to ``budget`` tokens.
 
-    try:
-        parsed = json.loads(message)
-        if isinstance(parsed, list):
-            return [str(tag) for tag in parsed][:5]
-    except json.JSONDecodeError:
-        pass
-
-    start = message.find("[")
-    end = message.rfind("]")
-    if start != -1 and end != -1:
+    Returns the text and its token count. Every word is at least one token,
+    so only the first ``budget`` words, capped at eight characters per
+    token, are tokenized instead of a whole ``textContent``.
+    """
+    words = (text or "").split(None, budget)[:budget]
+    compact = " ".join(words)[: budget * 8]
+    encoding = load_encoding()
+    if encoding is None:
+        # Roughly four characters per token.
+        compact = compact[: budget * 4]
+        return compact, len(compact) // 4 + 1
+    tokens = encoding.encode(compact, disallowed_special=())
+    if len(tokens) <= budget:
+        return compact, len(tokens)
+    # A cut inside a multi-byte character decodes to a replacement character.
+    return encoding.decode(tokens[:budget]).rstrip("\ufffd"), budget
+
+
+URL_STOP_WORDS = frozenset(
+    (
+        "amp and article articles aspx blog category com das default der die en "
+        "for htm html index net news org page php post posts the und watch with www"
+    ).split()
+)
+
+
+def is_text_source_meaningful(tokens: int, min_tokens: int = 8) -> bool:
+    # Counted in tokens rather than words, which scripts such as Chinese or
+    # Thai do not separate with spaces.
+    return tokens >= min_tokens
+
+
+def heuristic_tags_from_url(url: str) -> List[str]:
+    """Derive up to five tags from the domain and path of ``url``.
+
+    Used instead of the model for links that have nothing but a URL, where
+    a paid request would mostly return an empty list anyway.
+    """
+    parsed = urlparse(url or "")
+    host = (parsed.hostname or "").split(".")
+    tokens = [host[-2] if len(host) >= 2 else host[0]]
+    tokens += re.split(r"[-_./]+", parsed.path)
+
+    tags: List[str] = []
+    for token in tokens:
+        token = token.lower()
+        if (
+            len(token) < 3
+            or token in URL_STOP_WORDS
+            or any(char.isdigit() for char in token)
+            or token in tags
+        ):
+            continue
+        tags.append(token)
+        if len(tags) == 5:
+            break
+    return tags
+
+
+def link_text(link: dict) -> Tuple[str, int]:
+    """Pick and trim the text ``link`` is tagged from, with its token count.
+
+    The description, the text content and the name are tried in this order
+    and the first meaningful one is used, so a short description does not
+    hide the full text. Otherwise the first non-empty one is used, and an
+    empty text is returned for links that only have a URL.
+    """
+    fallback: Tuple[str, int] = ("", 0)
+    for source in (link.get("description"), link.get("textContent"), link.get("name")):
+        text, tokens = trim_text(source or "")
+        if not text:
+            continue
+        if is_text_source_meaningful(tokens):
+            return text, tokens
+        if not fallback[0]:
+            fallback = (text, tokens)
+    return fallback
+
+
+class TagCache:
+    """Exact-match cache of generated tags, persisted in SQLite.
+
+    Entries are keyed by a hash of the model, the system prompt and the
+    trimmed text, so changing either of the former invalidates the cache.
+    """
+
+    def __init__(self, directory: str, ttl: int) -> None:
+        self.path = os.path.join(directory, "tags.sqlite")
+        self.ttl = ttl
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tags "
+                "(key TEXT PRIMARY KEY, tags TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+        return self._db
+
+    @staticmethod
+    def key(content: str) -> str:
+        return hashlib.sha256(
+            f"{OPENAI_MODEL}\0{PROMPT_SYSTEM}\0{content}".encode()
+        ).hexdigest()
+
+    def get(self, content: str) -> Optional[List[str]]:
+        if self.ttl <= 0:
+            return None
+        row = self.db.execute(
+            "SELECT tags FROM tags WHERE key = ? AND expires > ?",
+            (self.key(content), time.time()),
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def set(self, content: str, tags: List[str]) -> None:
+        if self.ttl <= 0:
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO tags VALUES (?, ?, ?)",
+            (self.key(content), orjson.dumps(tags).decode(), time.time() + self.ttl),
+        )
+        self.db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class SemanticCache:
+    """Reuse tags of near-duplicate texts via sentence embeddings.
+
+    Embeddings are normalized, so the inner product search of the FAISS
+    index yields the cosine similarity. The index and the parallel list of
+    tag lists are stored next to the exact-match cache and discarded when
+    the model, the system prompt or the embedding model change.
+    """
+
+    def __init__(self, directory: str, threshold: float, model_name: str) -> None:
+        self.index_path = os.path.join(directory, "semantic.faiss")
+        self.manifest_path = os.path.join(directory, "semantic.json")
+        self.threshold = threshold
+        self.model_name = model_name
+        self.model: Any = None
+        self.index: Any = None
+        self.tags: List[List[str]] = []
+        self._pending: Dict[str, Any] = {}
+        self._dirty = False
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(
+            f"{OPENAI_MODEL}\0{PROMPT_SYSTEM}\0{self.model_name}".encode()
+        ).hexdigest()
+
+    def _load(self) -> None:
         try:
-            return [str(t) for t in json.loads(message[start : end + 1])][:5]
-        except json.JSONDecodeError:
-            return []
-    return []
+            import faiss
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            sys.exit(
+                "SEMANTIC_CACHE=1 requires: pip install sentence-transformers faiss-cpu"
+            )
+
+        self.model = SentenceTransformer(self.model_name)
+        try:
+            with open(self.manifest_path, "rb") as fh:
+                manifest = orjson.loads(fh.read())
+            if manifest.get("fingerprint") == self.fingerprint:
+                self.index = faiss.read_index(self.index_path)
+                self.tags = manifest["tags"]
+        except (OSError, ValueError, RuntimeError):
+            pass
+        if self.index is None or self.index.ntotal != len(self.tags):
+            self.index = faiss.IndexFlatIP(
+                self.model.get_sentence_embedding_dimension()
+            )
+            self.tags = []
+
+    def use_shard(self, shard: int) -> None:
+        """Keep the index of one worker process apart from the others'."""
+        directory = os.path.dirname(self.index_path)
+        self.index_path = os.path.join(directory, f"semantic-{shard}.faiss")
+        self.manifest_path = os.path.join(directory, f"semantic-{shard}.json")
+
+    def get(self, content: str) -> Optional[List[str]]:
+        if self.model is None:
+            self._load()
+
+        vec = self.model.encode([content], normalize_embeddings=True)
+        if self.index.ntotal:
+            scores, ids = self.index.search(vec, 1)
+            if scores[0][0] >= self.threshold:
+                return self.tags[ids[0][0]]
+        self._pending[content] = vec
+        return None
+
+    def set(self, content: str, tags: List[str]) -> None:
+        vec = self._pending.pop(content, None)
+        if vec is None:
+            if self.model is None:
+                self._load()
+            vec = self.model.encode([content], normalize_embeddings=True)
+        self.index.add(vec)
+        self.tags.append(tags)
+        self._dirty = True
+
+    def close(self) -> None:
+        if not self._dirty:
+            return
+
+        import faiss
+
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        faiss.write_index(self.index, self.index_path)
+        with open(self.manifest_path, "wb") as fh:
+            fh.write(
+                orjson.dumps({"fingerprint": self.fingerprint, "tags": self.tags})
+            )
+        self._dirty = False
+
+
+tag_cache = TagCache(CACHE_DIR, CACHE_TTL)
+semantic_cache = SemanticCache(
+    CACHE_DIR, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MODEL
+)
+tag_stores: List[Any] = [tag_cache, semantic_cache] if SEMANTIC_CACHE else [tag_cache]
+
+TagItems = List[Tuple[int, str]]
+RequestTags = Callable[
+    [aiohttp.ClientSession, TagItems], Awaitable[Dict[int, List[str]]]
+]
+
+
+def cached(stores: List[Any]) -> Callable[[RequestTags], RequestTags]:
+    """Serve tags for previously seen texts from the first matching store.
+
+    Each store provides ``get(content)`` and ``set(content, tags)``; only the
+    remaining items are passed on to the model and its results are written
+    to all stores.
+    """
+
+    def decorator(func: RequestTags) -> RequestTags:
+        @functools.wraps(func)
+        async def wrapper(
+            session: aiohttp.ClientSession, items: TagItems
+        ) -> Dict[int, List[str]]:
+            result: Dict[int, List[str]] = {}
+            misses: TagItems = []
+            for item_id, content in items:
+                if not content:
+                    result[item_id] = []
+                    continue
+                for store in stores:
+                    tags = store.get(content)
+                    if tags is not None:
+                        result[item_id] = tags
+                        break
+                else:
+                    misses.append((item_id, content))
+
+            if misses:
+                fresh = await func(session, misses)
+                for item_id, content in misses:
+                    if item_id in fresh:
+                        for store in stores:
+                            store.set(content, fresh[item_id])
+                result.update(fresh)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def parse_tag_map(message: str) -> Dict[int, List[str]]:
+    try:
+        results = orjson.loads(message)["results"]
+        return {
+            int(result["index"]): [str(tag) for tag in result["tags"]][:5]
+            for result in results
+        }
+    except (ValueError, KeyError, TypeError):
+        return {}
+
+
+@cached(tag_stores)
+@retry_transient
+async def request_tags_batch(
+    session: aiohttp.ClientSession, items: TagItems
+) -> Dict[int, List[str]]:
+    """Tag several trimmed texts with a single chat completion.
+
+    Returns the tags per item id; items the model did not answer for are
+    left out so that they are not cached.
+    """
+    content = "\n\n".join(
+        f"[{index}] {text}" for index, (_, text) in enumerate(items, 1)
+    )
+    async with openai_limiter, session.post(
+        OPENAI_URL,
+        data=orjson.dumps(
+            {
+                **OPENAI_REQUEST_TEMPLATE,
+                "messages": [SYSTEM_MESSAGE, {"role": "user", "content": content}],
+            }
+        ),
+    ) as resp:
+        resp.raise_for_status()
+        data = orjson.loads(await resp.read())
+    tag_map = parse_tag_map(data["choices"][0]["message"].get("content") or "")
+    return {
+        item_id: tag_map[index]
+        for index, (item_id, _) in enumerate(items, 1)
+        if index in tag_map
+    }
 
 
 def build_update_payload(link: dict, tags: List[str]) -> Optional[dict]:
-    if not link.get("collection"):
+    collection = link.get("collection")
+    if not tags or not collection:
         return None
 
-    existing = link.get("tags", [])
-    existing_names = {t.get("name") for t in existing if t.get("name")}
-    new_tags = [t for t in tags if t and t not in existing_names]
+    existing = link.get("tags") or ()
+    if existing:
+        existing_names = {t["name"] for t in existing if t.get("name")}
+        new_tags = [t for t in tags if t and t not in existing_names]
+    else:
+        new_tags = [t for t in tags if t]
     if not new_tags:
         return None
 
@@ -174,61 +965,330 @@ def build_update_payload(link: dict, tags: List[str]) -> Optional[dict]:
         {"id": tag.get("id"), "name": tag["name"]}
         for tag in existing
         if tag.get("name")
-    ] + [{"name": tag[:50]} for tag in new_tags][:5]
+    ]
+    tag_payload += [{"name": tag[:50]} for tag in new_tags[:5]]
 
-    pinned = link.get("pinnedBy")
-    pinned_payload = None
-    if isinstance(pinned, list):
-        pinned_payload = [{"id": item.get("id")} for item in pinned if item]
-
-    return {
+    get = link.get
+    payload = {
         "id": link["id"],
-        "name": link.get("name") or "",
-        "url": link.get("url"),
-        "description": link.get("description") or "",
-        "icon": link.get("icon"),
-        "iconWeight": link.get("iconWeight"),
-        "color": link.get("color"),
+        "name": get("name") or "",
+        "url": get("url"),
+        "description": get("description") or "",
+        "icon": get("icon"),
+        "iconWeight": get("iconWeight"),
+        "color": get("color"),
         "collection": {
-            "id": link.get("collectionId") or link["collection"]["id"],
-            "ownerId": link["collection"].get("ownerId"),
+            "id": get("collectionId") or collection["id"],
+            "ownerId": collection.get("ownerId"),
         },
         "tags": tag_payload,
-        **({"pinnedBy": pinned_payload} if pinned_payload is not None else {}),
     }
 
+    pinned = get("pinnedBy")
+    if isinstance(pinned, list):
+        payload["pinnedBy"] = [{"id": item.get("id")} for item in pinned if item]
+    return payload
 
-def main() -> None:
-    require(TOKEN, "LINKWARDEN_TOKEN")
-    require(OPENAI_API_KEY, "OPENAI_API_KEY")
 
-    session = requests.Session()
-    session.headers.update({"Authorization": f"Bearer {TOKEN}"})
+@retry_transient
+async def update_link_async(session: httpx.AsyncClient, payload: dict) -> None:
+    resp = await session.put(
+        LINK_UPDATE_URL_TEMPLATE.format(payload["id"]),
+        content=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+        timeout=30,
+    )
+    resp.raise_for_status()
 
-    for link in fetch_links(session):
-        if link.get("aiTagged"):
-            continue
-        if link.get("tags"):
-            continue
 
-        text_source = (
-            link.get("description")
-            or link.get("textContent")
-            or link.get("name")
-            or link.get("url")
-        )
+@retry_transient
+async def update_links_bulk(session: httpx.AsyncClient, payloads: List[dict]) -> None:
+    """Update several links with a single request to the bulk endpoint.
+
+    The endpoint appends ``newData.tags`` to the tags of every listed link,
+    so with an empty list each link gets exactly the tags of its payload.
+    """
+    body = {"links": payloads, "removePreviousTags": False, "newData": {"tags": []}}
+    resp = await session.put(
+        LINKS_URL,
+        content=orjson.dumps(body),
+        headers={"Content-Type": "application/json"},
+        # The server updates the listed links one after another.
+        timeout=60,
+    )
+    resp.raise_for_status()
 
-        tags = request_tags(text_source or "")
+
+class BulkEndpoint:
+    """Whether the server accepts bulk updates, shared by the update workers.
+
+    Until a bulk request has succeeded, only one worker at a time sends
+    one, so a server without the endpoint is probed only once.
+    """
+
+    def __init__(self) -> None:
+        self.supported: Optional[bool] = None if LINKWARDEN_BATCH_SIZE > 1 else False
+        self._probe = asyncio.Lock()
+
+    async def update(self, session: httpx.AsyncClient, payloads: List[dict]) -> bool:
+        """Update ``payloads`` in one request; ``False`` if they still need
+        to be updated one by one."""
+        if self.supported is None:
+            async with self._probe:
+                if self.supported is None:
+                    return await self._send(session, payloads)
+        if not self.supported:
+            return False
+        return await self._send(session, payloads)
+
+    async def _send(self, session: httpx.AsyncClient, payloads: List[dict]) -> bool:
+        try:
+            await update_links_bulk(session, payloads)
+        except httpx.HTTPStatusError as exc:
+            if is_retryable(exc):
+                raise
+            # Servers without the bulk endpoint answer 404/405. Other client
+            # errors mean some links failed; updating them one by one raises
+            # the error of the failing link.
+            if exc.response.status_code in (404, 405):
+                self.supported = False
+            return False
+        self.supported = True
+        return True
+
+
+async def next_batch(queue: asyncio.Queue) -> List[Tuple[dict, str]]:
+    """Take the next batch of links and their trimmed texts off ``queue``.
+
+    Waits for the first link only and then takes whatever is already
+    queued, up to ``OPENAI_BATCH_SIZE`` links or ``OPENAI_BATCH_TOKENS``.
+    Returns an empty list once the producer is done.
+    """
+    batch: List[Tuple[dict, str]] = []
+    tokens = 0
+    link = await queue.get()
+    while link is not SENTINEL:
+        content, count = link_text(link)
+        batch.append((link, content))
+        tokens += count
+        if (
+            len(batch) >= OPENAI_BATCH_SIZE
+            or tokens >= OPENAI_BATCH_TOKENS
+            or queue.empty()
+        ):
+            return batch
+        link = queue.get_nowait()
+
+    # Put the end marker back for the remaining workers.
+    queue.put_nowait(SENTINEL)
+    return batch
+
+
+async def process_batch(
+    openai: aiohttp.ClientSession,
+    batch: List[Tuple[dict, str]],
+    update_queue: asyncio.Queue,
+) -> None:
+    tags_by_id: Dict[int, List[str]] = {}
+    items: TagItems = []
+    for link, content in batch:
+        if content:
+            items.append((link["id"], content))
+        else:
+            tags_by_id[link["id"]] = heuristic_tags_from_url(link.get("url") or "")
+    if items:
+        tags_by_id.update(await request_tags_batch(openai, items))
+
+    for link, _ in batch:
+        tags = tags_by_id.get(link["id"], [])
         payload = build_update_payload(link, tags)
-        if not payload:
-            continue
+        if payload:
+            await update_queue.put((payload, tags))
+
+
+async def tag_worker(
+    openai: aiohttp.ClientSession,
+    link_queue: asyncio.Queue,
+    update_queue: asyncio.Queue,
+) -> None:
+    while batch := await next_batch(link_queue):
+        await process_batch(openai, batch, update_queue)
+
 
-        link_path = LINKWARDEN_LINK_PATH.rstrip("/") if LINKWARDEN_LINK_PATH else "/api/v1/links"
-        resp = session.put(
-            join_url(BASE_URL, f"{link_path}/{link['id']}"), json=payload, timeout=30
+async def tag_stage(
+    openai: aiohttp.ClientSession,
+    link_queue: asyncio.Queue,
+    update_queue: asyncio.Queue,
+) -> None:
+    """Run ``OPENAI_CONCURRENCY`` taggers and close ``update_queue`` afterwards."""
+    await asyncio.gather(
+        *(
+            tag_worker(openai, link_queue, update_queue)
+            for _ in range(OPENAI_CONCURRENCY)
         )
-        resp.raise_for_status()
-        print(f"Updated link {link['id']} with tags: {tags}")
+    )
+    await update_queue.put(SENTINEL)
+
+
+async def next_updates(queue: asyncio.Queue) -> List[Tuple[dict, List[str]]]:
+    """Take the next batch of update bodies and their tags off ``queue``.
+
+    Like ``next_batch``, waits for the first update only and then takes
+    whatever is already queued, up to ``LINKWARDEN_BATCH_SIZE`` updates.
+    Returns an empty list once the tagging stage is done.
+    """
+    batch: List[Tuple[dict, List[str]]] = []
+    item = await queue.get()
+    while item is not SENTINEL:
+        batch.append(item)
+        if len(batch) >= LINKWARDEN_BATCH_SIZE or queue.empty():
+            return batch
+        item = queue.get_nowait()
+
+    # Put the end marker back for the remaining workers.
+    queue.put_nowait(SENTINEL)
+    return batch
+
+
+async def update_worker(
+    linkwarden: httpx.AsyncClient, queue: asyncio.Queue, bulk: BulkEndpoint
+) -> None:
+    while batch := await next_updates(queue):
+        payloads = [payload for payload, _ in batch]
+        if len(payloads) > 1 and await bulk.update(linkwarden, payloads):
+            payloads = []
+        # Single updates share the multiplexed HTTP/2 connection.
+        await asyncio.gather(
+            *(update_link_async(linkwarden, payload) for payload in payloads)
+        )
+        for payload, tags in batch:
+            checkpoint.add(payload["id"])
+            print(f"Updated link {payload['id']} with tags: {tags}")
+
+
+async def update_stage(linkwarden: httpx.AsyncClient, queue: asyncio.Queue) -> None:
+    """Run ``LINKWARDEN_CONCURRENCY`` updaters sharing one ``BulkEndpoint``."""
+    bulk = BulkEndpoint()
+    await asyncio.gather(
+        *(
+            update_worker(linkwarden, queue, bulk)
+            for _ in range(LINKWARDEN_CONCURRENCY)
+        )
+    )
+
+
+def openai_session() -> aiohttp.ClientSession:
+    """Return the session used for chat completion requests.
+
+    Requests are sent with aiohttp directly rather than through the OpenAI
+    SDK, which keeps the per-request overhead low at high concurrency. Each
+    worker has at most one request in flight, so the pool holds one
+    keep-alive connection per worker and DNS lookups are cached.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=OPENAI_CONCURRENCY, keepalive_timeout=60, ttl_dns_cache=300
+        ),
+        headers=OPENAI_HEADERS,
+        timeout=aiohttp.ClientTimeout(total=60),
+    )
+
+
+def linkwarden_client() -> httpx.AsyncClient:
+    # A single HTTP/2 connection multiplexes the search and update requests.
+    return httpx.AsyncClient(
+        http2=True,
+        headers={"Authorization": f"Bearer {TOKEN}"},
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        timeout=httpx.Timeout(60.0),
+    )
+
+
+async def async_main(source: Any = None) -> None:
+    """Tag the links from the search, or those from ``source`` in a worker."""
+    async with linkwarden_client() as linkwarden, openai_session() as openai:
+        # Searching, tagging and updating run as separate stages connected by
+        # queues, so the update latency stays off the tagging critical path.
+        link_queue: asyncio.Queue = asyncio.Queue(maxsize=200)
+        update_queue: asyncio.Queue = asyncio.Queue(maxsize=500)
+
+        checkpoint.open()
+        try:
+            await asyncio.gather(
+                fetch_links(linkwarden, link_queue)
+                if source is None
+                else receive_links(source, link_queue),
+                tag_stage(openai, link_queue, update_queue),
+                update_stage(linkwarden, update_queue),
+            )
+        finally:
+            checkpoint.close()
+            for store in tag_stores:
+                store.close()
+
+
+async def distribute(link_queues: List[Any], done: Any, workers: List[Any]) -> None:
+    """Stream the search once and hand the pending links to ``workers``."""
+    async with linkwarden_client() as linkwarden:
+        checkpoint.open()
+        try:
+            await asyncio.gather(
+                fetch_links(linkwarden, ShardQueues(link_queues, workers)),
+                collect_done(done, workers),
+            )
+        finally:
+            checkpoint.close()
+
+
+def run_shard(shard: int, links: Any, done: Any) -> None:
+    """Tag the links handed over through ``links`` in a worker process."""
+    semantic_cache.use_shard(shard)
+    checkpoint.forward_to(done)
+    asyncio.run(async_main(links))
+
+
+def main() -> None:
+    require(TOKEN, "LINKWARDEN_TOKEN")
+    require(OPENAI_API_KEY, "OPENAI_API_KEY")
+    # Fetch the tokenizer data before the event loop starts.
+    load_encoding()
+
+    if PROCESSES == 1:
+        asyncio.run(async_main())
+        return
+
+    # The parent streams the search once and writes the checkpoint; the
+    # workers only tag and update. "spawn" gives every worker a fresh
+    # interpreter and event loop. Plain processes are used instead of a
+    # pool, which hangs on exceptions such as httpx errors that cannot be
+    # unpickled; workers report their own tracebacks and fail with a
+    # non-zero exit code instead.
+    context = multiprocessing.get_context("spawn")
+    link_queues = [context.Queue(maxsize=200) for _ in range(PROCESSES)]
+    done = context.Queue()
+    workers = [
+        context.Process(target=run_shard, args=(shard, link_queues[shard], done))
+        for shard in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        asyncio.run(distribute(link_queues, done, workers))
+    except BaseException:
+        for worker in workers:
+            worker.terminate()
+        raise
+    finally:
+        for worker in workers:
+            worker.join()
+        # Links still buffered for a worker that exited early can never be
+        # delivered; without this, exiting waits for the queue feeder threads
+        # forever.
+        for link_queue in link_queues:
+            link_queue.cancel_join_thread()
+    failed = sum(worker.exitcode != 0 for worker in workers)
+    if failed:
+        sys.exit(f"{failed} of {PROCESSES} worker processes failed")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+"""Regression checks for generate_ai_tags.py against a local mock server.
+
+Run with: python -m pytest scripts/test_generate_ai_tags.py
+"""
+
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+from aiohttp import web
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_ai_tags.py")
+
+
+def start_mock_server(link_count: int) -> int:
+    """Serve ``link_count`` untagged links and reject every chat completion."""
+    links = [
+        {
+            "id": i,
+            "name": f"Link {i}",
+            "url": f"https://example.com/post-{i}",
+            "description": "An article about python asyncio performance " * 4,
+            "collection": {"id": 1, "ownerId": 1},
+            "tags": [],
+        }
+        for i in range(1, link_count + 1)
+    ]
+
+    async def search(request: web.Request) -> web.Response:
+        return web.json_response({"data": {"links": links, "nextCursor": None}})
+
+    async def chat(request: web.Request) -> web.Response:
+        await request.read()
+        return web.json_response({"error": "bad request"}, status=400)
+
+    app = web.Application()
+    app.router.add_get("/api/v1/search", search)
+    app.router.add_post("/v1/chat/completions", chat)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return port
+
+
+def test_failing_worker_process_exits_non_zero(tmp_path):
+    # Enough links that the queue of the failed worker exceeds a pipe buffer.
+    port = start_mock_server(3000)
+    env = dict(
+        os.environ,
+        LINKWARDEN_BASE_URL=f"http://127.0.0.1:{port}",
+        LINKWARDEN_TOKEN="token",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{port}",
+        OPENAI_API_KEY="key",
+        WORKER_PROCESSES="2",
+        CACHE_DIR=str(tmp_path),
+    )
+    result = subprocess.run(
+        [sys.executable, SCRIPT], env=env, capture_output=True, timeout=60
+    )
+    assert result.returncode != 0